@@ -1,5 +1,5 @@
 import streamlit as st
-from data_processor import load_and_process  # Kitchen import
+from data_processor import load_and_process, DASHBOARD_YEARS, DASHBOARD_EXCLUDED_CATEGORIES  # Kitchen import
 import pandas as pd
 import plotly.express as px
 from scipy import stats
@@ -123,15 +123,12 @@ The 'Other' category is excluded for clarity.
 # Load from kitchen (cached)
 @st.cache_data
 def get_data():
-    return load_and_process()
+    # Limit to 2019-2022 and drop 'Other' (pushed down into the processor)
+    return load_and_process(year_range=DASHBOARD_YEARS, exclude_categories=DASHBOARD_EXCLUDED_CATEGORIES)
 
 try:
     cat_df, claims_df, nlp_model = get_data()
     
-    # Limit to 2019-2022 and drop 'Other'
-    cat_df = cat_df[(cat_df['Year'] >= 2019) & (cat_df['Year'] <= 2022) & (cat_df['Category'] != 'Other')]
-    claims_df = claims_df[(claims_df['Year'] >= 2019) & (claims_df['Year'] <= 2022)]
-    
 except Exception as e:
     st.error(f"Error loading data: {e}")
     cat_df = pd.DataFrame()